@@ -1,143 +1,221 @@
 import argparse
+try:
+    import pylibyaml  # noqa: F401  (patches yaml to prefer the libyaml C bindings)
+except ImportError:
+    pass
 import yaml
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import json
+import mmap
+import os
+import shlex
+import sys
+from functools import lru_cache
 from pathlib import Path
 from pydantic import ValidationError
 from schema import EnvironmentConfig 
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 CONFIG_DIR = Path("./configs")
 OUTPUT_DIR = Path("./tf_dir")
 OUTPUT_DIR.mkdir(exist_ok=True)
 ENVIRONMENTS = ['dev', 'staging', 'prod']
+_ENV_LABELS = {env: env.upper() for env in ENVIRONMENTS}
 
-def recursive_merge(base: Dict, override: Dict) -> Dict:
-    """Recursively merge override dictionary into base dictionary."""
-    merged = base.copy()
+#Use libyaml's C parser when available, fall back to the pure-Python one
+_LOADER = yaml.CSafeLoader if hasattr(yaml, 'CSafeLoader') else yaml.SafeLoader
+
+def _merge_into(base: Dict, override: Dict) -> Dict:
+    """Merge override dictionary into base in place and return base.
+
+    base is consumed. Nested dicts are only copied along keys that override touches,
+    so untouched subtrees (which may be shared with the YAML cache) are never visited.
+    """
     for key, value in override.items():
-        if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
-            merged[key] = recursive_merge(merged[key], value)
+        base_value = base.get(key)
+        if isinstance(base_value, dict) and isinstance(value, dict):
+            base[key] = _merge_into(dict(base_value), value)
         else:
-            merged[key] = value
-    return merged
+            base[key] = value
+    return base
 
-def get_config_for_env(env: str) -> Dict[str, Any]:
-    """Load and merge base and environment-specific config."""
-    base_file = CONFIG_DIR / "base-config.yaml"
-    env_file = CONFIG_DIR / f"{env}.yaml"
+def _file_stamp(path: Path) -> Optional[Tuple[int, int, int, int]]:
+    """Cache key for path's current contents, or None if it does not exist, using a single stat() call.
 
-    if not base_file.exists():
-        raise FileNotFoundError(f"Base configuration file not found at {base_file}")
+    ctime is included because copy tools (cp -p, rsync -a, tar) can preserve mtime but not ctime.
+    """
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino
+
+@lru_cache(maxsize=None)
+def _load_yaml(path_str: str, stamp: Tuple[int, int, int, int]) -> Any:
+    """Parse a YAML file once per process; the stat stamp in the key invalidates replaced or edited files."""
+    with open(path_str, 'rb') as f:
+        #mmap cannot map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try:
+                return yaml.load(mm, Loader=_LOADER)
+            except yaml.MarkedYAMLError as e:
+                #The mmap has no name, point the error back at the file (libyaml's marks are read-only)
+                for attr in ('context_mark', 'problem_mark'):
+                    mark = getattr(e, attr)
+                    if mark is not None:
+                        setattr(e, attr, yaml.Mark(path_str, mark.index, mark.line, mark.column, None, None))
+                raise
+
+@lru_cache(maxsize=None)
+def _build_config(env: str, base_stamp: Tuple[int, int, int, int],
+                  env_stamp: Optional[Tuple[int, int, int, int]]) -> Dict[str, Any]:
+    """Merge the cached base and env YAML for one environment."""
+    base_config = _load_yaml(str(CONFIG_DIR / "base-config.yaml"), base_stamp)
 
-    with open(base_file, 'r') as f:
-        base_config = yaml.safe_load(f)
-    
     env_config = {}
-    if env_file.exists():
-        with open(env_file, 'r') as f:
-            env_config = yaml.safe_load(f) or {}
+    if env_stamp is not None:
+        env_config = _load_yaml(str(CONFIG_DIR / f"{env}.yaml"), env_stamp) or {}
 
     #Merge to base
-    final_config = recursive_merge(base_config, env_config)   
+    #Shallow copy only the top level, the cached base must stay intact
+    final_config = _merge_into(dict(base_config), env_config)
     
     #Add environment name for use in custom validators.
     final_config['environment'] = env 
     
     return final_config
 
-def validate_config(env: str, config: Dict[str, Any]) -> bool:
-    """Validates the merged configuration using Pydantic."""
-    print(f"Validating configuration for **{env.upper()}**...")
+def get_config_for_env(env: str) -> Dict[str, Any]:
+    """Load and merge base and environment-specific config.
+
+    Results are memoized per file stat stamp, so callers must treat the returned dict as read-only.
+    """
+    base_file = CONFIG_DIR / "base-config.yaml"
+    env_file = CONFIG_DIR / f"{env}.yaml"
+
+    base_stamp = _file_stamp(base_file)
+    if base_stamp is None:
+        raise FileNotFoundError(f"Base configuration file not found at {base_file}")
+
+    return _build_config(env, base_stamp, _file_stamp(env_file))
+
+def validate_config(env: str, config: Dict[str, Any]) -> Optional[EnvironmentConfig]:
+    """Validates the merged configuration using Pydantic, returning the model or None on failure."""
+    #env is not checked against ENVIRONMENTS here, so fall back for other names
+    label = _ENV_LABELS.get(env) or env.upper()
+    print(f"Validating configuration for **{label}**...")
     try:
-        EnvironmentConfig(**config)
-        print(f"Validation successful for **{env.upper()}**.")
-        return True
+        #Validate the parsed dict directly against the model's prebuilt pydantic-core validator
+        model = EnvironmentConfig.model_validate(config)
+        print(f"Validation successful for **{label}**.")
+        return model
     except ValidationError as e:
-        print(f"Validation failed for **{env.upper()}**:")
+        print(f"Validation failed for **{label}**:")
         #Error output
         for error in e.errors():
             field = " -> ".join(map(str, error['loc']))
             print(f"   - **{field}**: {error['msg']}")
-        return False
+        return None
 
-def generate_tfvars(env: str, config: Dict[str, Any]):
-    """Generates a Terraform .tfvars file from the validated config."""
+def _format_hcl_value(value: Any) -> str:
+    """Render a value as an HCL literal. JSON's true/false/"str"/123 forms (and lists) are valid HCL.
+
+    orjson is only a speedup, the json fallback emits the same compact form.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode()
+        except TypeError: #orjson.JSONEncodeError, e.g. ints beyond 64 bits
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+#HCL formatting per exact value type (so bool is not treated as int), strings and anything else go through _format_hcl_value
+_TFVARS_FORMATTERS = {
+    bool: lambda v: 'true' if v else 'false',
+    int: str,
+    float: str,
+}
+
+def generate_tfvars(env: str, model: EnvironmentConfig):
+    """Generates a Terraform .tfvars file from the validated model."""
     output_file = OUTPUT_DIR / f"{env}.tfvars"
     
-    #Pydantic structure, use its dict conversion, excluding the 'environment' field
-    validated_data = EnvironmentConfig(**config).dict(exclude={'environment'})
-    
-    tfvars_content = []
-    
     #Conversion logic: terraform expects variables like resource_field = value
-    for resource_name, resource_data in validated_data.items():
+    #Dump the model built by validate_config, fields marked exclude=True in schema.py (environment) are left out.
+    items = []
+    for resource_name, resource_data in model.model_dump(mode='python').items():
         if isinstance(resource_data, dict):
-            for field, value in resource_data.items():
-                # Handle boolean/string/int formatting for HCL
-                if isinstance(value, str):
-                    value_str = f'"{value}"'
-                elif isinstance(value, bool):
-                    value_str = str(value).lower() # true/false
-                else:
-                    value_str = str(value)
-                
-                tfvars_content.append(f'{resource_name}_{field} = {value_str}')
+            items.extend((f'{resource_name}_{field}', value) for field, value in resource_data.items())
         else:
             #Handle top level fields
-            tfvars_content.append(f'{resource_name} = {resource_data}')
+            items.append((resource_name, resource_data))
 
     with open(output_file, 'w') as f:
-        f.write("\n".join(tfvars_content))
+        f.write("\n".join(f'{key} = {_TFVARS_FORMATTERS.get(type(value), _format_hcl_value)(value)}' for key, value in items))
     
     print(f"Generated **{output_file}** successfully.")
 
 
+_MISSING = '<<<MISSING>>>'
+
+def _diff_dicts(a: Dict, b: Dict, out: Dict, prefix: str = '', sep: str = '_') -> Dict:
+    """Collect differing leaves of two nested dicts into out as joined_key -> (a_value, b_value).
+
+    Equal subtrees are skipped with one C-level comparison per key, so only differing branches are walked.
+    """
+    for k in a.keys() | b.keys():
+        val1 = a.get(k, _MISSING)
+        val2 = b.get(k, _MISSING)
+        if val1 is val2 or val1 == val2:
+            continue
+        new_key = f"{prefix}{sep}{k}" if prefix else k
+        is_dict1 = isinstance(val1, dict)
+        is_dict2 = isinstance(val2, dict)
+        if is_dict1 or is_dict2:
+            #Leaves under a dict on one side only are reported as missing on the other
+            _diff_dicts(val1 if is_dict1 else {}, val2 if is_dict2 else {}, out, new_key, sep)
+            if not (is_dict1 and is_dict2) and _MISSING not in (val1, val2):
+                out[new_key] = (_MISSING if is_dict1 else val1, _MISSING if is_dict2 else val2)
+        else:
+            out[new_key] = (val1, val2)
+    return out
+
 def run_diff(env1: str, env2: str):
     """Compare the final configuration of two environments."""
     if env1 not in ENVIRONMENTS or env2 not in ENVIRONMENTS:
         print("Invalid environment(s) specified for diff.")
         return
         
-    config1 = get_config_for_env(env1)
-    config2 = get_config_for_env(env2)
-    
-    print(f"**DIFF MODE**: Comparing **{env1.upper()}** vs **{env2.upper()}**")
+    #Skip internal tracking field, shallow copies since the cached configs are read-only
+    config1 = {k: v for k, v in get_config_for_env(env1).items() if k != 'environment'}
+    config2 = {k: v for k, v in get_config_for_env(env2).items() if k != 'environment'}
     
-    #Use a flat list for diffing for the simplified scope
+    label1, label2 = _ENV_LABELS[env1], _ENV_LABELS[env2]
+    print(f"**DIFF MODE**: Comparing **{label1}** vs **{label2}**")
     
-    #Helper to flatten dict for comparison
-    def flatten_dict(d: Dict, parent_key: str = '', sep: str = '_') -> Dict:
-        items = {}
-        for k, v in d.items():
-            new_key = parent_key + sep + k if parent_key else k
-            if isinstance(v, dict):
-                items.update(flatten_dict(v, new_key, sep=sep))
-            else:
-                items[new_key] = v
-        return items
-
-    flat1 = flatten_dict(config1)
-    flat2 = flatten_dict(config2)
+    #Fast path: one C-level deep comparison settles the common "nothing changed" case
+    if config1 == config2:
+        print("   - Configurations are **identical**.")
+        return
     
-    all_keys = sorted(set(list(flat1.keys()) + list(flat2.keys())))
+    #Only subtrees that differ are descended into
+    diffs = _diff_dicts(config1, config2, {})
     
-    diff_found = False
-    for key in all_keys:
-        if key == 'environment': #Skip internal tracking field
-            continue
+    for key in sorted(diffs):
+        val1, val2 = diffs[key]
+        print(f"   - **{key}**: **{label1}**=`{val1}` | **{label2}**=`{val2}`")
             
-        val1 = flat1.get(key, '<<<MISSING>>>')
-        val2 = flat2.get(key, '<<<MISSING>>>')
-        
-        if val1 != val2:
-            print(f"   - **{key}**: **{env1.upper()}**=`{val1}` | **{env2.upper()}**=`{val2}`")
-            diff_found = True
-            
-    if not diff_found:
+    #Configs can differ only in ways the flattened view ignores, e.g. an empty dict present on one side
+    if not diffs:
         print("   - Configurations are **identical**.")
 
 #CLI 
-def main():
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Multi-Environment Configuration Management Tool.")
     subparsers = parser.add_subparsers(dest='command', required=True)
 
@@ -154,15 +232,20 @@ def main():
     parser_diff.add_argument('env1', choices=ENVIRONMENTS, help='First environment for comparison.')
     parser_diff.add_argument('env2', choices=ENVIRONMENTS, help='Second environment for comparison.')
 
-    args = parser.parse_args()
+    #Serve
+    subparsers.add_parser('serve', help='Read validate/generate/diff commands from stdin, one per line, in a single process.')
+
+    return parser
 
+def run_command(args: argparse.Namespace):
+    """Run one parsed validate/generate/diff command."""
     if args.command == 'validate':
         envs_to_validate = ENVIRONMENTS if args.env == 'all' else [args.env]
         
         all_valid = True
         for env in envs_to_validate:
             config = get_config_for_env(env)
-            if not validate_config(env, config):
+            if validate_config(env, config) is None:
                 all_valid = False
         
         if all_valid:
@@ -173,12 +256,47 @@ def main():
     elif args.command == 'generate':
         env = args.env
         config = get_config_for_env(env)
-        if validate_config(env, config):
-            generate_tfvars(env, config)
+        model = validate_config(env, config)
+        if model is not None:
+            generate_tfvars(env, model)
 
     elif args.command == 'diff':
         run_diff(args.env1, args.env2)
 
+def serve(parser: argparse.ArgumentParser):
+    """Run commands from stdin in this process so imports and parsed configs are reused between them."""
+    for line in sys.stdin:
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            print(f"Invalid command: {e}")
+            continue
+        if not argv:
+            continue
+        if argv[0] == 'serve':
+            print("Already serving, expected validate/generate/diff.")
+            continue
+        try:
+            args = parser.parse_args(argv)
+        except SystemExit:
+            #argparse has already printed the usage error
+            continue
+        try:
+            run_command(args)
+        except (OSError, yaml.YAMLError) as e:
+            #Report and keep serving, later commands in the batch may still succeed
+            print(f"Command failed: {e}")
+        sys.stdout.flush()
+
+def main():
+    parser = _build_parser()
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(parser)
+    else:
+        run_command(args)
+
 if __name__ == "__main__":
     #Create the schema.py file first to run the main script
     main()
@@ -1,9 +1,14 @@
-from pydantic import BaseModel, Field, validator
-from typing import Literal, Optional
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from typing import Literal, Optional, get_args
 
 #Allowed values
-ALLOWED_INSTANCE_TYPES = {"t3.small", "t3.medium", "t3.large", "m5.large"}
-ALLOWED_DB_ENGINES = {"postgres", "mysql"}
+InstanceType = Literal["t3.small", "t3.medium", "t3.large", "m5.large"]
+ALLOWED_INSTANCE_TYPES = frozenset(get_args(InstanceType))
+ALLOWED_DB_ENGINES = frozenset({"postgres", "mysql"})
+
+#Prod safety rule constants
+_PROD_MIN_RETENTION = 30
+_PROD_PUBLIC_ERR = "Prod database *must not* be publicly accessible."
 
 #Resource schema
 
@@ -13,15 +18,10 @@ class DatabaseConfig(BaseModel):
     publicly_accessible: bool = Field(..., description="Must be False for Prod")
 
 class ComputeConfig(BaseModel):
-    instance_type: str = Field(..., description="AWS Instance type")
+    #Literal is matched inside pydantic-core, no Python validator call per instance
+    instance_type: InstanceType = Field(..., description="AWS Instance type")
     replicas: int = Field(..., description="Number of instances/replicas")
 
-    @validator('instance_type')
-    def validate_instance_type(cls, v):
-        if v not in ALLOWED_INSTANCE_TYPES:
-            raise ValueError(f"Instance type '{v}' is not in allowed list: {ALLOWED_INSTANCE_TYPES}")
-        return v
-
 #Main schema config
 
 class EnvironmentConfig(BaseModel):
@@ -31,17 +31,17 @@ class EnvironmentConfig(BaseModel):
     database: DatabaseConfig
     api_service: ComputeConfig
     
-    #Safety rules
-    @validator('database', always=True)
-    def validate_prod_database_safety(cls, v, values):
-        env = values.get('environment')
-        
-        #R1: prod databases must not be publicly accessible
-        if env == 'prod' and v.publicly_accessible is True:
-            raise ValueError("Prod database *must not* be publicly accessible.")
-        
-        #R2: prod must have sufficient backup retention
-        if env == 'prod' and v.backup_retention < 30:
-            raise ValueError(f"Prod backup_retention must be >= 30, found {v.backup_retention}.")
+    #Safety rules, environment is declared first so it is already in info.data
+    @field_validator('database')
+    @classmethod
+    def validate_prod_database_safety(cls, v: DatabaseConfig, info: ValidationInfo) -> DatabaseConfig:
+        if info.data.get('environment') == 'prod':
+            #R1: prod databases must not be publicly accessible
+            if v.publicly_accessible:
+                raise ValueError(_PROD_PUBLIC_ERR)
+            
+            #R2: prod must have sufficient backup retention
+            if v.backup_retention < _PROD_MIN_RETENTION:
+                raise ValueError(f"Prod backup_retention must be >= {_PROD_MIN_RETENTION}, found {v.backup_retention}.")
 
         return v